@@ -1,11 +1,18 @@
+import io
+import html
 import time
 import json
+import functools
 import streamlit as st
 from music_theory import (
     build_pool, get_progression,
     format_key_display, format_chord_display,
     build_roman, QUALITIES, QUALITY_IDS,
+    load_difficulty, build_weighted_sampler,
 )
+# Optional subsystems (history, classroom, deck_export) are imported where
+# they are first used, so a session only pays for the screens and modes it
+# opens. Shared objects are built once per process with st.cache_resource.
 
 # ── Page config ───────────────────────────────────────────────────────────────
 st.set_page_config(page_title="Chord Flashcards", page_icon="🎵", layout="centered")
@@ -52,6 +59,9 @@ st.markdown("""
   .hint { font-size:.8rem;color:#94a3b8;text-align:center;margin-top:.2rem; }
   .fb-chord-ok  { color:#22c55e;font-weight:700;font-size:1rem;text-align:center; }
   .fb-chord-bad { color:#ef4444;font-weight:700;font-size:1rem;text-align:center; }
+  .board     { border:1px solid #e2e8f0;border-radius:8px;padding:.4rem .7rem;margin-top:.6rem;font-size:.9rem; }
+  .board-row { display:flex;justify-content:space-between; }
+  .board-row.me { color:#6366f1;font-weight:700; }
 </style>
 """, unsafe_allow_html=True)
 
@@ -60,7 +70,7 @@ def init_state():
     defaults = {
         "use_triads": True, "use_sevenths": True, "prog_length": 4,
         "timer_on": True, "timer_seconds": 60, "auto_advance": True,
-        "quick_mode": False,
+        "quick_mode": False, "adaptive": False, "target_rate": 0.7,
         "degree_keys": dict(DEFAULT_DEGREE_KEYS),
         "quality_keys": dict(DEFAULT_QUALITY_KEYS),
         "screen": "settings",
@@ -68,6 +78,7 @@ def init_state():
         "slot_degrees": [], "slot_quals": [],
         "active_slot": 0, "start_time": None,
         "score": 0, "correct": 0, "incorrect": 0,
+        "race_room": None, "race_name": "", "race_token": None, "race_round": 0,
     }
     for k, v in defaults.items():
         if k not in st.session_state:
@@ -81,17 +92,84 @@ def slot_roman(i):
     if d is None: return None
     return build_roman(d, q if q else "maj")
 
+@st.cache_resource
+def get_race_hub():
+    """One leaderboard for every session in this process."""
+    from classroom import RaceHub
+    return RaceHub()
+
+# room settings every player in a race must share
+RACE_SETTINGS = ("use_triads", "use_sevenths", "prog_length", "timer_seconds")
+
+def enter_race(room, name, token, entry):
+    """Switch this session into a race, resuming `entry` = (score, correct, incorrect, round)."""
+    s = st.session_state
+    s.race_room, s.race_name, s.race_token = room, name, token
+    s.quick_mode = False
+    s.adaptive = False
+    for k in RACE_SETTINGS:
+        s[k] = room[k]
+    s.timer_on = True
+    s.score, s.correct, s.incorrect, s.race_round = entry
+    # kept in the URL so a page refresh rejoins under the same name
+    st.query_params.from_dict({"room": room["code"], "player": name, "token": token})
+    s.screen = "waiting"
+    poll_race_start()
+
+def watch_race(room):
+    s = st.session_state
+    s.race_room, s.race_name = room, ""
+    st.query_params.from_dict({"room": room["code"], "watch": "1"})
+    s.screen = "watch"
+
+def leave_race():
+    st.session_state.race_room = None
+    st.query_params.clear()
+
+def poll_race_start():
+    """Begin playing once the room's shared start time has passed."""
+    s = st.session_state
+    room = s.race_room
+    if room["started"] is None or room["started"] > time.time():
+        live = get_race_hub().room(room["code"])
+        if live and live["created"] == room["created"]:
+            s.race_room = room = live
+    if room["started"] is None or room["started"] > time.time():
+        return
+    # everyone is timed from the same start
+    s.start_time = room["started"]
+    if check_remaining() <= 0:
+        s.screen = "gameover"
+    else:
+        s.screen = "playing"
+        new_round()
+
 def start_game():
     st.session_state.score = 0
     st.session_state.correct = 0
     st.session_state.incorrect = 0
+    st.session_state.race_round = 0
     st.session_state.start_time = time.time()
     st.session_state.screen = "playing"
     new_round()
 
+@st.cache_resource(ttl=600)
+def get_sampler(use_triads, use_sevenths, target_rate):
+    """Alias-table sampler, shared per process; picks up a recalibrated table within 10 min."""
+    pool = build_pool(use_triads, use_sevenths)
+    return build_weighted_sampler(pool, load_difficulty(), target_rate)
+
 def new_round():
-    pool = build_pool(st.session_state.use_triads, st.session_state.use_sevenths)
-    prog = get_progression(pool, st.session_state.prog_length)
+    s = st.session_state
+    if s.race_room:
+        from classroom import race_progression
+        prog = race_progression(s.race_room, s.race_round)
+        s.race_round += 1
+    else:
+        pool = build_pool(s.use_triads, s.use_sevenths)
+        sampler = (get_sampler(s.use_triads, s.use_sevenths, s.target_rate)
+                   if s.adaptive and not is_quick_mode() else None)
+        prog = get_progression(pool, s.prog_length, sampler)
     st.session_state.progression = prog
     st.session_state.slot_degrees = [None] * len(prog)
     st.session_state.slot_quals = [None] * len(prog)
@@ -102,14 +180,21 @@ def check_remaining():
     return max(0.0, st.session_state.timer_seconds - (time.time() - st.session_state.start_time))
 
 def submit_answers():
+    from history import make_attempts, log_attempts
     prog = st.session_state.progression
-    all_ok = all(slot_roman(i) == prog[i][2] for i in range(len(prog)))
+    answers = [slot_roman(i) for i in range(len(prog))]
+    log_attempts(make_attempts(prog, answers))
+    all_ok = all(answers[i] == prog[i][2] for i in range(len(prog)))
     if all_ok:
         st.session_state.score += 1
         st.session_state.correct += 1
     else:
         st.session_state.score -= 1
         st.session_state.incorrect += 1
+    s = st.session_state
+    if s.race_room:
+        get_race_hub().post_score(s.race_room, s.race_name,
+                                  s.score, s.correct, s.incorrect, s.race_round)
     st.session_state.screen = "feedback"
 
 def next_round_fn():
@@ -164,6 +249,23 @@ def cycle_quality(direction):
     idx = (idx + direction) % len(QUALITY_IDS)
     st.session_state.slot_quals[i] = QUALITY_IDS[idx]
 
+# ── Deck export ───────────────────────────────────────────────────────────────
+EXPORT_LABELS = {"csv": "CSV", "anki": "Anki (text import)", "html": "Printable worksheet (HTML)"}
+# format id -> (file extension, mime type); kept here so deck_export loads on Download only
+EXPORT_FILES = {"csv": ("csv", "text/csv"), "anki": ("txt", "text/plain"), "html": ("html", "text/html")}
+
+def export_deck(fmt, use_triads, use_sevenths, length, count, all_cards, answers):
+    """Run the export pipeline into a string; called when Download is clicked."""
+    from deck_export import export, iter_all_cards, iter_drills, iter_rows
+    if all_cards:
+        drills = iter_all_cards(use_triads, use_sevenths)
+    else:
+        drills = iter_drills(build_pool(use_triads, use_sevenths), length, count)
+    buf = io.StringIO()
+    kwargs = {"answers": answers} if fmt == "html" else {}
+    export(fmt, iter_rows(drills), buf, **kwargs)
+    return buf.getvalue()
+
 # ── Timer / score bar ─────────────────────────────────────────────────────────
 def draw_timer_bar(remaining):
     if not st.session_state.timer_on: return
@@ -185,6 +287,19 @@ def draw_score_row(remaining):
         f'✗ <span class="score-val">{s.incorrect}</span></span>'
         f'</div>', unsafe_allow_html=True)
 
+def draw_leaderboard(limit=10):
+    room = st.session_state.race_room
+    if not room: return
+    rows = get_race_hub().leaderboard(room)
+    me = st.session_state.race_name
+    board_html = f'<div class="board"><b>🏁 Room {html.escape(room["code"])}</b>'
+    for rank, (player, score, correct, incorrect) in enumerate(rows[:limit], 1):
+        css = "board-row me" if player == me else "board-row"
+        board_html += (f'<div class="{css}"><span>{rank}. {html.escape(player)}</span>'
+                       f'<span>{score:+d} &nbsp;✓{correct} ✗{incorrect}</span></div>')
+    board_html += '</div>'
+    st.markdown(board_html, unsafe_allow_html=True)
+
 # ── Keyboard JS ───────────────────────────────────────────────────────────────
 def make_keyboard_js(screen):
     deg_map  = st.session_state.degree_keys
@@ -267,6 +382,27 @@ def make_keyboard_js(screen):
 
     return f"<script>(function(){{ if(window._kbDone) return; window._kbDone=true; {action_js} }})();</script>"
 
+# ── Race resume after a page refresh ──────────────────────────────────────────
+def resume_race():
+    from classroom import NameTakenError
+    q = st.query_params
+    room = get_race_hub().room(q["room"])
+    if room is None:
+        leave_race()
+    elif q.get("watch"):
+        watch_race(room)
+    elif q.get("player") and q.get("token"):
+        try:
+            room, entry = get_race_hub().join(room["code"], q["player"], q["token"],
+                                              {k: room[k] for k in RACE_SETTINGS})
+        except NameTakenError:
+            leave_race()
+        else:
+            enter_race(room, q["player"], q["token"], entry)
+
+if st.session_state.race_room is None and st.query_params.get("room"):
+    resume_race()
+
 
 # ════════════════════════════════════════════════════════════════════════════
 # Use a single st.empty() placeholder so screen transitions fully replace DOM
@@ -291,6 +427,7 @@ if st.session_state.screen == "settings":
         quick_clicked = st.button("⚡ Quick Mode (triads only)", use_container_width=True, type="primary")
     if quick_clicked:
         st.session_state.quick_mode = True
+        leave_race()
         st.session_state.use_triads = True
         st.session_state.use_sevenths = False
         st.session_state.prog_length = 1
@@ -322,6 +459,14 @@ if st.session_state.screen == "settings":
         "Move to next slot automatically when degree + quality are both set",
         value=st.session_state.auto_advance)
 
+    st.subheader("Adaptive difficulty")
+    ac1, ac2 = st.columns([1, 3])
+    adaptive = ac1.checkbox("Enable", value=st.session_state.adaptive,
+                            help="Favour chords you get right about this often, "
+                                 "using the table from calibrate.py.")
+    target_rate = ac2.slider("Target success rate", 0.5, 0.95, st.session_state.target_rate,
+                             0.05, disabled=not adaptive, label_visibility="collapsed")
+
     st.subheader("Keybindings")
     with st.expander("Customise keybindings", expanded=False):
         st.markdown("**Degree keys** (scale degree 1–7):")
@@ -367,18 +512,74 @@ if st.session_state.screen == "settings":
 **↑ / ↓** cycle quality · **Enter** submit
 """)
 
+    with st.expander("Classroom race", expanded=False):
+        st.markdown("Everyone who joins the same room plays the same progressions "
+                    "and shares a live leaderboard. Whoever opens the room sets the "
+                    "chord types, length and timer. The race starts for everyone at "
+                    "once when the host (or any player) presses Start; **Host / "
+                    "watch** shows just the leaderboard, e.g. on a projector. A room "
+                    "lasts 3 hours; after that its code starts a fresh room with new "
+                    "progressions and an empty leaderboard. Each name can play once "
+                    "per room; refreshing the page picks up where you left off.")
+        rc1, rc2 = st.columns(2)
+        race_code = rc1.text_input("Room code", max_chars=20, key="race_code_in").strip()
+        race_name = rc2.text_input("Your name", max_chars=20, key="race_name_in").strip()
+        race_settings = {
+            "use_triads": use_triads, "use_sevenths": use_sevenths,
+            "prog_length": prog_length,
+            "timer_seconds": timer_seconds if timer_on else 300,
+        }
+        no_chords = not (use_triads or use_sevenths)
+        jc1, jc2 = st.columns(2)
+        if jc1.button("🏁 Join race", disabled=not (race_code and race_name) or no_chords):
+            from classroom import NameTakenError, new_token
+            token = st.session_state.race_token or new_token()
+            try:
+                room, entry = get_race_hub().join(race_code, race_name, token, race_settings)
+            except NameTakenError:
+                st.error(f"“{race_name}” is already playing in room {race_code} — pick another name.")
+            else:
+                st.session_state.auto_advance = auto_advance
+                st.session_state.degree_keys  = dk
+                st.session_state.quality_keys = qk
+                enter_race(room, race_name, token, entry)
+                st.rerun()
+        if jc2.button("📺 Host / watch", disabled=not race_code or no_chords):
+            watch_race(get_race_hub().open_room(race_code, race_settings))
+            st.rerun()
+
+    with st.expander("Export deck (CSV / Anki / printable)", expanded=False):
+        ec1, ec2 = st.columns(2)
+        exp_fmt = ec1.selectbox("Format", list(EXPORT_LABELS),
+                                format_func=EXPORT_LABELS.get, key="export_fmt")
+        exp_count = ec2.number_input("Progressions", 1, 1000, 50, key="export_count")
+        exp_all = st.checkbox("Every chord in every key instead (one per card)",
+                              key="export_all")
+        exp_answers = exp_fmt == "html" and st.checkbox("Include answers", key="export_answers")
+        if use_triads or use_sevenths:
+            st.download_button(
+                "⬇ Download",
+                data=functools.partial(export_deck, exp_fmt, use_triads, use_sevenths,
+                                       prog_length, exp_count, exp_all, exp_answers),
+                file_name=f"chord-flashcards.{EXPORT_FILES[exp_fmt][0]}",
+                mime=EXPORT_FILES[exp_fmt][1],
+                use_container_width=True)
+
     st.markdown("---")
     disabled = not (use_triads or use_sevenths)
     col = st.columns([1,2,1])[1]
     with col:
         if st.button("▶ Start Game", use_container_width=True, disabled=disabled):
             st.session_state.quick_mode    = False
+            leave_race()
             st.session_state.use_triads    = use_triads
             st.session_state.use_sevenths  = use_sevenths
             st.session_state.prog_length   = prog_length
             st.session_state.timer_on      = timer_on
             st.session_state.timer_seconds = timer_seconds
             st.session_state.auto_advance  = auto_advance
+            st.session_state.adaptive      = adaptive
+            st.session_state.target_rate   = target_rate
             st.session_state.degree_keys   = dk
             st.session_state.quality_keys  = qk
             start_game()
@@ -386,6 +587,51 @@ if st.session_state.screen == "settings":
     if disabled:
         st.warning("Select at least one chord type.")
 
+# ════════════════════════════════════════════════════════════════════════════
+# RACE WAITING SCREEN (joined, race not started yet)
+# ════════════════════════════════════════════════════════════════════════════
+elif st.session_state.screen == "waiting":
+  with _page.container():
+    poll_race_start()
+    if st.session_state.screen != "waiting":
+        st.rerun()
+    room = st.session_state.race_room
+    st.markdown('<p class="main-title">🎵 Chord Flashcards</p>', unsafe_allow_html=True)
+    if room["started"] is None:
+        st.markdown("<p style='text-align:center'>Waiting for the race to start…</p>",
+                    unsafe_allow_html=True)
+        if st.button("🏁 Start race for everyone"):
+            get_race_hub().start(room["code"])
+            poll_race_start(); st.rerun()
+    else:
+        st.markdown(f"<p style='text-align:center;font-size:1.5rem;font-weight:700'>"
+                    f"Starting in {max(0, room['started'] - time.time()):.0f} s</p>",
+                    unsafe_allow_html=True)
+    draw_leaderboard(limit=50)
+    if st.button("Leave race"):
+        leave_race()
+        st.session_state.screen = "settings"; st.rerun()
+    time.sleep(1)
+    st.rerun()
+
+# ════════════════════════════════════════════════════════════════════════════
+# SPECTATOR SCREEN (leaderboard only)
+# ════════════════════════════════════════════════════════════════════════════
+elif st.session_state.screen == "watch":
+  with _page.container():
+    room = st.session_state.race_room
+    if room["started"] is None:
+        live = get_race_hub().room(room["code"])
+        if live and live["created"] == room["created"]:
+            st.session_state.race_room = room = live
+    if room["started"] is None:
+        if st.button("🏁 Start race"):
+            get_race_hub().start(room["code"])
+            st.rerun()
+    draw_leaderboard(limit=50)
+    time.sleep(1)
+    st.rerun()
+
 # ════════════════════════════════════════════════════════════════════════════
 # PLAYING SCREEN
 # ════════════════════════════════════════════════════════════════════════════
@@ -521,6 +767,8 @@ elif st.session_state.screen == "playing":
             '↑↓ = cycle quality &nbsp;|&nbsp; Enter = submit</p>',
             unsafe_allow_html=True)
 
+    draw_leaderboard()
+
     # Inject keyboard JS (quick mode gets simplified version)
     if quick:
         st.components.v1.html(make_keyboard_js("playing_quick"), height=0)
@@ -575,6 +823,8 @@ elif st.session_state.screen == "feedback":
         if st.button(lbl, key="next_btn", use_container_width=True, type="primary"):
             next_round_fn(); st.rerun()
 
+    draw_leaderboard()
+
     st.components.v1.html(make_keyboard_js("feedback"), height=0)
 
 # ════════════════════════════════════════════════════════════════════════════
@@ -593,10 +843,17 @@ elif st.session_state.screen == "gameover":
     c1.metric("Final Score",  f"{score:+d}")
     c2.metric("Correct ✓",   st.session_state.correct)
     c3.metric("Incorrect ✗", st.session_state.incorrect)
+    if st.session_state.race_room:
+        draw_leaderboard(limit=50)
+        if st.button("↻ Refresh leaderboard"):
+            st.rerun()
     st.markdown("---")
     b1, b2 = st.columns(2)
     with b1:
-        if st.button("🔄 Play Again", use_container_width=True, type="primary"):
+        again = "🔄 Play Again (solo)" if st.session_state.race_room else "🔄 Play Again"
+        if st.button(again, use_container_width=True, type="primary"):
+            # a race is played once; replaying would overwrite the posted score
+            leave_race()
             start_game(); st.rerun()
     with b2:
         if st.button("⚙️ Settings", use_container_width=True):
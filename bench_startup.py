@@ -0,0 +1,85 @@
+"""
+Cold-start benchmark.
+
+Each measurement runs in a fresh interpreter, so nothing is already imported
+or cached:
+
+  import   time to import each app module on its own (streamlit included)
+  first    AppTest.from_file("app.py") + first run() — a new session's first
+           paint in a new process, including `import app` dependencies
+  next     a second session in the same process — what later visitors pay
+           once per-process caches are warm
+
+    python bench_startup.py --repeat 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+MODULES = ["streamlit", "music_theory", "history", "classroom",
+           "deck_export", "calibrate", "store"]
+
+_IMPORT_SNIPPET = """
+import time
+t = time.perf_counter()
+import {mod}
+print(time.perf_counter() - t)
+"""
+
+_RENDER_SNIPPET = """
+import sys, time
+t = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t_lib = time.perf_counter()
+at = AppTest.from_file("app.py", default_timeout=30)
+at.run()
+t_first = time.perf_counter()
+AppTest.from_file("app.py", default_timeout=30).run()
+t_next = time.perf_counter()
+loaded = sorted(m for m in {mods!r} if m in sys.modules)
+print(t_lib - t, t_first - t_lib, t_next - t_first, ",".join(loaded))
+"""
+
+
+def _run(snippet: str) -> list:
+    out = subprocess.run([sys.executable, "-c", snippet], capture_output=True,
+                         text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    return out.stdout.split()
+
+
+def _ms(samples: list) -> str:
+    return f"{statistics.median(samples) * 1000:8.1f} ms"
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Measure import and first-render time.")
+    p.add_argument("--repeat", type=int, default=5, help="fresh processes per measurement")
+    args = p.parse_args(argv)
+
+    print("import time (median of fresh processes)")
+    for mod in MODULES:
+        try:
+            samples = [float(_run(_IMPORT_SNIPPET.format(mod=mod))[0])
+                       for _ in range(args.repeat)]
+        except subprocess.CalledProcessError:
+            print(f"  {mod:<14} not importable here")
+            continue
+        print(f"  {mod:<14}{_ms(samples)}")
+
+    lib, first, nxt = [], [], []
+    for _ in range(args.repeat):
+        a, b, c, *loaded = _run(_RENDER_SNIPPET.format(mods=MODULES))
+        lib.append(float(a))
+        first.append(float(b))
+        nxt.append(float(c))
+    print("settings screen render (median)")
+    print(f"  {'test harness':<14}{_ms(lib)}")
+    print(f"  {'first session':<14}{_ms(first)}")
+    print(f"  {'next session':<14}{_ms(nxt)}")
+    print(f"  modules loaded after first paint: {loaded[0] if loaded else '-'}")
+
+
+if __name__ == "__main__":
+    main()
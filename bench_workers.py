@@ -0,0 +1,110 @@
+"""
+Throughput benchmark: how answer throughput scales with workers.
+
+Script reruns are CPU work bound by the GIL within one Streamlit process,
+so capacity is roughly (what one worker sustains) x (number of workers).
+This runs 1..N worker processes at once. Each one holds several sessions
+with Streamlit's AppTest, all racing in one classroom room, and answers
+round after round: every answer is a Submit rerun (attempt log write to
+the shared store, leaderboard post) and a Next rerun (leaderboard read).
+It reports answers per second across all workers and the attempt rows
+that reached the store.
+
+Only script and store work is measured. launcher.py's proxy and the
+browser websocket are not exercised, so the numbers are not end-to-end
+session counts.
+
+    python bench_workers.py --max-workers 4 --seconds 10
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sqlite3
+import time
+
+BENCH_SETTINGS = {"use_triads": True, "use_sevenths": True,
+                  "prog_length": 4, "timer_seconds": 600}
+
+
+def _session(hub, room_code: str, name: str):
+    from streamlit.testing.v1 import AppTest
+    from classroom import new_token
+
+    at = AppTest.from_file("app.py", default_timeout=30)
+    at.run()
+    # timer off so a rerun is pure script work, without the 1 s sleep
+    next(c for c in at.checkbox if c.label == "Enable timer").uncheck().run()
+    next(b for b in at.button if b.label == "▶ Start Game").click().run()
+    # move the session into the bench room: answers are posted to its leaderboard
+    room, _ = hub.join(room_code, name, new_token(), BENCH_SETTINGS)
+    at.session_state["race_room"] = room
+    at.session_state["race_name"] = name
+    return at
+
+
+def _worker(room_code: str, sessions: int, seconds: float, start_at: float, out):
+    from classroom import RaceHub
+
+    hub = RaceHub()
+    ats = [_session(hub, room_code, f"{os.getpid()}-{i}") for i in range(sessions)]
+
+    while time.time() < start_at:
+        time.sleep(0.01)
+    answers = 0
+    end = start_at + seconds
+    while time.time() < end:
+        at = ats[answers % sessions]
+        at.button(key="submit_main").click().run()
+        at.button(key="next_btn").click().run()
+        answers += 1
+    out.put(answers)
+
+
+def _attempt_rows(db: str) -> int:
+    conn = sqlite3.connect(db)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM attempts").fetchone()[0]
+    except sqlite3.Error:
+        return 0
+    finally:
+        conn.close()
+
+
+def measure(workers: int, sessions: int, seconds: float) -> tuple:
+    """(answers/s, attempt rows written/s) across `workers` processes."""
+    db = os.environ["CHORD_DB"]
+    rows_before = _attempt_rows(db)
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    room_code = f"bench-{time.time():.0f}-{workers}"
+    start_at = time.time() + 5.0 + sessions  # leave time for imports and session setup
+    procs = [ctx.Process(target=_worker, args=(room_code, sessions, seconds, start_at, out))
+             for _ in range(workers)]
+    for p in procs:
+        p.start()
+    total = sum(out.get() for _ in procs)
+    for p in procs:
+        p.join()
+    return total / seconds, (_attempt_rows(db) - rows_before) / seconds
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Answers/s vs worker count, with store writes.")
+    p.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--sessions", type=int, default=4, help="sessions held by each worker")
+    p.add_argument("--seconds", type=float, default=10.0)
+    args = p.parse_args(argv)
+
+    os.environ.setdefault("CHORD_DB", os.path.abspath("bench.sqlite3"))
+    print(f"{'workers':>7} {'sessions':>9} {'answers/s':>10} {'rows/s':>8} {'speedup':>8}")
+    base = None
+    for n in range(1, args.max_workers + 1):
+        rate, rows = measure(n, args.sessions, args.seconds)
+        base = base or rate
+        print(f"{n:>7} {n * args.sessions:>9} {rate:>10.1f} {rows:>8.1f} {rate / base:>7.2f}x")
+    print("Scripted sessions (AppTest) with store writes; launcher.py's proxy and the "
+          "browser websocket are not measured.")
+
+
+if __name__ == "__main__":
+    main()
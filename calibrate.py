@@ -0,0 +1,120 @@
+"""
+Offline item-difficulty calibration.
+
+Fits a Rasch/Elo-style model to the attempt log written by history.py:
+
+    P(correct) = sigmoid(ability - difficulty)
+    difficulty = key effect + (degree, quality) effect + per-card residual
+
+Ability and the three effects are L2-regularised: small or one-sided logs
+can't push the ability to extremes, and rarely-seen cards borrow strength
+from their key and chord type. Fitting is full-batch diagonal-Newton ascent
+with NumPy over the whole log. The result is written as a compact JSON table
+that music_theory.load_difficulty() reads:
+
+    python calibrate.py --log chords.sqlite3 -o difficulty.json
+"""
+import argparse
+import json
+import sqlite3
+from array import array
+
+import numpy as np
+
+from history import LOG_PATH, iter_attempts
+from music_theory import (
+    ALL_KEYS, QUALITY_IDS, DIFFICULTY_PATH,
+    build_pool, parse_roman, card_id,
+)
+
+N_KEYS = len(ALL_KEYS)
+N_DQ = 7 * len(QUALITY_IDS)  # (degree, quality) combinations
+
+_KEY_IDX = {k: i for i, k in enumerate(ALL_KEYS)}
+_QUAL_IDX = {q: i for i, q in enumerate(QUALITY_IDS)}
+
+
+def _dq_index(degree: int, quality_id: str) -> int:
+    return (degree - 1) * len(QUALITY_IDS) + _QUAL_IDX[quality_id]
+
+
+def load_log(records) -> tuple:
+    """
+    Turn attempt records into parallel arrays (key_idx, dq_idx, ok).
+    Records with unknown keys, degrees or qualities are skipped.
+    """
+    keys, dqs, oks = array("i"), array("i"), array("b")
+    for r in records:
+        k = _KEY_IDX.get(r.get("key"))
+        deg, qual = r.get("degree"), r.get("quality")
+        if k is None or qual not in _QUAL_IDX or not isinstance(deg, int) or not 1 <= deg <= 7:
+            continue
+        keys.append(k)
+        dqs.append(_dq_index(deg, qual))
+        oks.append(1 if r.get("ok") else 0)
+    return (np.frombuffer(keys, dtype=np.int32), np.frombuffer(dqs, dtype=np.int32),
+            np.frombuffer(oks, dtype=np.int8).astype(np.float64))
+
+
+def fit(key_idx, dq_idx, ok, iters: int = 200, lr: float = 0.5, l2_ability: float = 1.0,
+        l2_key: float = 1.0, l2_dq: float = 1.0, l2_card: float = 5.0) -> tuple:
+    """
+    Maximum a posteriori fit. Returns (ability, key_eff, dq_eff, card_eff)
+    with card_eff indexed by key_idx * N_DQ + dq_idx.
+    """
+    n = len(ok)
+    card_idx = key_idx * N_DQ + dq_idx
+    ability = 0.0
+    b_key = np.zeros(N_KEYS)
+    b_dq = np.zeros(N_DQ)
+    b_card = np.zeros(N_KEYS * N_DQ)
+    if n == 0:
+        return ability, b_key, b_dq, b_card
+    # diagonal Newton steps: each parameter is scaled by its own curvature,
+    # so rarely-seen cards converge as fast as the global ability
+    h_key = 0.25 * np.bincount(key_idx, minlength=N_KEYS) + l2_key
+    h_dq = 0.25 * np.bincount(dq_idx, minlength=N_DQ) + l2_dq
+    h_card = 0.25 * np.bincount(card_idx, minlength=N_KEYS * N_DQ) + l2_card
+    for _ in range(iters):
+        logit = ability - b_key[key_idx] - b_dq[dq_idx] - b_card[card_idx]
+        resid = ok - 1.0 / (1.0 + np.exp(-logit))
+        # d(loglik)/d(difficulty) = -resid, summed per parameter
+        ability += lr * (resid.sum() - l2_ability * ability) / (0.25 * n + l2_ability)
+        b_key -= lr * (np.bincount(key_idx, resid, N_KEYS) + l2_key * b_key) / h_key
+        b_dq -= lr * (np.bincount(dq_idx, resid, N_DQ) + l2_dq * b_dq) / h_dq
+        b_card -= lr * (np.bincount(card_idx, resid, N_KEYS * N_DQ) + l2_card * b_card) / h_card
+    return ability, b_key, b_dq, b_card
+
+
+def difficulty_table(ability, b_key, b_dq, b_card) -> dict:
+    """Difficulty for every diatonic card, in load_difficulty() format."""
+    cards = {}
+    for key, _, roman in build_pool(True, True):
+        deg, qual = parse_roman(roman)
+        k, dq = _KEY_IDX[key], _dq_index(deg, qual)
+        b = b_key[k] + b_dq[dq] + b_card[k * N_DQ + dq]
+        cards[card_id(key, deg, qual)] = round(float(b), 3)
+    return {"ability": round(float(ability), 3), "cards": cards}
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Fit per-card difficulty from the attempt log.")
+    p.add_argument("--log", default=LOG_PATH, help="store holding the attempt log")
+    p.add_argument("-o", "--output", default=DIFFICULTY_PATH, help="difficulty table to write")
+    p.add_argument("--iters", type=int, default=200, help="gradient steps")
+    args = p.parse_args(argv)
+
+    try:
+        key_idx, dq_idx, ok = load_log(iter_attempts(args.log))
+    except sqlite3.Error as e:
+        p.error(f"cannot read attempt log {args.log}: {e}")
+    if len(ok) == 0:
+        p.error(f"no attempts in {args.log}; {args.output} left unchanged")
+    table = difficulty_table(*fit(key_idx, dq_idx, ok, iters=args.iters))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(table, f, separators=(",", ":"))
+    print(f"{len(ok)} attempts -> {len(table['cards'])} cards written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Classroom race mode: every player in a room gets the same seeded sequence
+of progressions, timed from one shared start, and posts scores to one
+process-wide leaderboard.
+
+Writes go through a lock; readers only ever pick up an immutable snapshot
+tuple, which is rebuilt at most every SNAPSHOT_INTERVAL seconds however many
+scores arrive in between. Players see the board on their own timer reruns,
+so a submission never triggers reruns in other sessions. Dirty entries are
+written to the shared store in one batch every FLUSH_INTERVAL seconds by a
+background thread.
+
+Rooms and scores live in the shared store, so players routed to different
+worker processes (launcher.py) still race in the same room: snapshots merge
+this process's scores with everyone else's, refreshed every SHARED_REFRESH
+seconds. Each player's entry carries the time of its last update and the
+newer of the local and shared copy wins.
+
+A room lasts ROOM_TTL seconds from its creation. After that, joining the
+same code starts a fresh room: new settings, an empty leaderboard and a
+new sequence of progressions. Scores are keyed by the room's generation
+(its `created` time), so posts from an expired room never reach its
+successor.
+
+Each player gets a token when they first join. Joining again with the same
+name and token (after a page refresh) resumes their entry; the name is
+refused to anyone else.
+"""
+import json
+import random
+import secrets
+import sqlite3
+import threading
+import time
+
+import store
+from music_theory import build_pool, get_progression
+
+SNAPSHOT_INTERVAL = 0.5
+SHARED_REFRESH = 2.0
+FLUSH_INTERVAL = 2.0
+ROOM_TTL = 3 * 60 * 60
+START_COUNTDOWN = 5.0
+
+
+class NameTakenError(ValueError):
+    """Raised by RaceHub.join when another player holds the name in the room."""
+
+
+def race_progression(room: dict, round_no: int) -> list:
+    """The `round_no`-th progression of a room; identical for every player."""
+    rng = random.Random(f"{room['code']}:{room['created']}:{round_no}")
+    pool = build_pool(room["use_triads"], room["use_sevenths"])
+    return get_progression(pool, room["prog_length"], rng=rng)
+
+
+def new_token() -> str:
+    """A player token, kept by the client to rejoin under the same name."""
+    return secrets.token_urlsafe(12)
+
+
+class RaceHub:
+    """Rooms and leaderboards shared by every session in the process."""
+
+    def __init__(self, db_path: str = store.DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._rebuild_locks = {}  # (code, created) -> lock for that board's rebuild
+        self._rooms = {}          # code -> room dict, as last read from the store
+        self._scores = {}         # (code, created) -> {player: (score, correct, incorrect, round, updated)}
+        self._dirty = set()       # (code, created, player) awaiting flush
+        self._snapshots = {}      # (code, created) -> (built_at, version, rows)
+        self._versions = {}       # (code, created) -> bumped on every local score change
+        threading.Thread(target=self._flush_loop, daemon=True).start()
+
+    # ── Rooms ────────────────────────────────────────────────────────────────
+    def open_room(self, code: str, settings: dict) -> dict:
+        """
+        The current room `code`, creating it with `settings` if it is new or
+        has expired. Returns the room dict: the settings every player must
+        use plus `code`, `created` and `started` (None until started).
+        """
+        now = time.time()
+        room = dict(settings, code=code, created=now, started=None)
+        try:
+            conn = store.connect(self.db_path)
+            try:
+                with conn:
+                    expired = [r[0] for r in conn.execute(
+                        "SELECT created FROM race_rooms WHERE code = ? AND created < ?",
+                        (code, now - ROOM_TTL))]
+                    if expired:
+                        conn.execute("DELETE FROM race_rooms WHERE code = ?", (code,))
+                        conn.execute("DELETE FROM race_scores WHERE room = ?", (code,))
+                    conn.execute("INSERT OR IGNORE INTO race_rooms VALUES (?, ?, ?, NULL)",
+                                 (code, json.dumps(settings), now))
+                room = self._read_room(conn, code) or room
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._rooms[code] = room
+        return room
+
+    def room(self, code: str) -> dict:
+        """The live room `code` from the store, or None if there is none."""
+        try:
+            conn = store.connect(self.db_path)
+            try:
+                room = self._read_room(conn, code)
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            room = self._rooms.get(code)
+        if room and time.time() - room["created"] > ROOM_TTL:
+            return None
+        if room:
+            with self._lock:
+                self._rooms[code] = room
+        return room
+
+    @staticmethod
+    def _read_room(conn, code):
+        row = conn.execute("SELECT settings, created, started FROM race_rooms WHERE code = ?",
+                           (code,)).fetchone()
+        if row is None:
+            return None
+        return dict(json.loads(row[0]), code=code, created=row[1], started=row[2])
+
+    def start(self, code: str) -> dict:
+        """Start room `code` after a short countdown; a no-op if already started."""
+        try:
+            conn = store.connect(self.db_path)
+            try:
+                with conn:
+                    conn.execute("UPDATE race_rooms SET started = ? WHERE code = ?"
+                                 " AND started IS NULL", (time.time() + START_COUNTDOWN, code))
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            pass
+        return self.room(code)
+
+    def join(self, code: str, player: str, token: str, settings: dict) -> tuple:
+        """
+        Join room `code` as `player`, opening the room with `settings` if
+        needed. Returns (room, entry) where entry is the player's saved
+        (score, correct, incorrect, round): zeros for a new player, their
+        progress when `token` matches an earlier join. Raises NameTakenError
+        if the name belongs to another token.
+        """
+        room = self.room(code) or self.open_room(code, settings)
+        gen = (code, room["created"])
+        now = time.time()
+        entry = (0, 0, 0, 0, now)
+        try:
+            conn = store.connect(self.db_path)
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT OR IGNORE INTO race_scores VALUES (?, ?, ?, ?, 0, 0, 0, 0, ?)",
+                        (code, room["created"], player, token, now))
+                    row = conn.execute(
+                        "SELECT token, score, correct, incorrect, round, updated FROM race_scores"
+                        " WHERE room = ? AND created = ? AND player = ?",
+                        (code, room["created"], player)).fetchone()
+            finally:
+                conn.close()
+            if row[0] != token:
+                raise NameTakenError(f"{player!r} is already playing in room {code!r}")
+            entry = tuple(row[1:])
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            board = self._scores.setdefault(gen, {})
+            # this process may hold a newer, not yet flushed copy
+            if player not in board or board[player][4] < entry[4]:
+                board[player] = entry
+            entry = board[player][:4]
+            self._versions[gen] = self._versions.get(gen, 0) + 1
+        return room, entry
+
+    # ── Scores ───────────────────────────────────────────────────────────────
+    def post_score(self, room: dict, player: str, score: int, correct: int,
+                   incorrect: int, round_no: int):
+        """
+        Record a player's latest totals; repeated posts simply overwrite.
+        Posts for an expired room are dropped.
+        """
+        now = time.time()
+        if now - room["created"] > ROOM_TTL:
+            return
+        gen = (room["code"], room["created"])
+        with self._lock:
+            self._scores.setdefault(gen, {})[player] = (score, correct, incorrect, round_no, now)
+            self._dirty.add(gen + (player,))
+            self._versions[gen] = self._versions.get(gen, 0) + 1
+
+    def leaderboard(self, room: dict) -> tuple:
+        """
+        Snapshot of ((player, score, correct, incorrect), ...) sorted best
+        first. Lock-free unless a rebuild is due; while another session is
+        rebuilding this room's board, its previous snapshot is returned (the
+        first build of a board is waited for).
+        """
+        gen = (room["code"], room["created"])
+        now = time.monotonic()
+        snap = self._snapshots.get(gen)
+        version = self._versions.get(gen, 0)
+        if snap:
+            age = now - snap[0]
+            if age < SNAPSHOT_INTERVAL or (snap[1] == version and age < SHARED_REFRESH):
+                return snap[2]
+        with self._lock:
+            rebuild_lock = self._rebuild_locks.setdefault(gen, threading.Lock())
+        if not rebuild_lock.acquire(blocking=snap is None):
+            return snap[2]
+        try:
+            snap = self._snapshots.get(gen)
+            if snap and now - snap[0] < SNAPSHOT_INTERVAL:
+                return snap[2]  # built by the session we waited for
+            merged = {player: tuple(entry) for player, *entry in self._load_scores(*gen)}
+            with self._lock:
+                version = self._versions.get(gen, 0)
+                local = dict(self._scores.get(gen, {}))
+            for player, entry in local.items():
+                # keep whichever copy was updated last (entry[4] is the time)
+                if player not in merged or entry[4] >= merged[player][4]:
+                    merged[player] = entry
+            rows = tuple(sorted(
+                ((p,) + entry[:3] for p, entry in merged.items()),
+                key=lambda r: (-r[1], -r[2], r[0])))
+            self._snapshots[gen] = (now, version, rows)
+        finally:
+            rebuild_lock.release()
+        return rows
+
+    # ── Persistence ──────────────────────────────────────────────────────────
+    def _load_scores(self, code: str, created: float) -> list:
+        try:
+            conn = store.connect(self.db_path)
+            try:
+                return conn.execute(
+                    "SELECT player, score, correct, incorrect, round, updated FROM race_scores"
+                    " WHERE room = ? AND created = ?", (code, created)).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return []
+
+    def flush(self):
+        """Write every changed score to SQLite in a single transaction."""
+        with self._lock:
+            if not self._dirty:
+                return
+            rows = [self._scores[(code, created)][player] + (code, created, player)
+                    for code, created, player in self._dirty]
+            self._dirty = set()
+        try:
+            conn = store.connect(self.db_path)
+            try:
+                with conn:
+                    # UPDATE, not upsert: rows of a deleted (expired) room stay gone
+                    conn.executemany(
+                        "UPDATE race_scores SET score = ?, correct = ?, incorrect = ?,"
+                        " round = ?, updated = ? WHERE room = ? AND created = ? AND player = ?",
+                        rows)
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            # retry on the next flush
+            with self._lock:
+                self._dirty.update(r[5:] for r in rows)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            self.flush()
@@ -0,0 +1,176 @@
+"""
+Export flashcard decks as CSV, Anki import text or a printable HTML worksheet.
+
+Everything is a generator pipeline: cards are produced one at a time and
+written straight to the output, so even a 100k-card deck runs in constant
+memory.
+
+Command line:
+    python deck_export.py --format csv --count 100000 -o deck.csv
+    python deck_export.py --format anki --all -o deck.txt
+    python deck_export.py --format html --count 40 --seed 7 -o sheet.html
+    python deck_export.py --format html --count 40 --seed 7 --answers -o key.html
+"""
+import argparse
+import csv
+import html
+import random
+import sys
+
+from music_theory import (
+    build_pool, get_progression,
+    format_key_display, format_chord_display,
+)
+
+# ---------------------------------------------------------------------------
+# Card sources
+# ---------------------------------------------------------------------------
+
+def iter_all_cards(use_triads: bool, use_sevenths: bool):
+    """
+    Yield one single-chord drill per (key, chord type) in the selected space.
+    Each item: [(key, chord_name, roman_str)].
+    """
+    for item in build_pool(use_triads, use_sevenths):
+        yield [item]
+
+
+def iter_drills(pool: list, length: int, count: int):
+    """Yield `count` progressions of `length` chords drawn from `pool`."""
+    for _ in range(count):
+        yield get_progression(pool, length)
+
+
+def iter_rows(drills):
+    """
+    Flatten progressions into (key, chords, romans) rows, where chords and
+    romans are space-separated strings.
+    """
+    for prog in drills:
+        yield (
+            prog[0][0],
+            " ".join(chord for _, chord, _ in prog),
+            " ".join(roman for _, _, roman in prog),
+        )
+
+
+# ---------------------------------------------------------------------------
+# Writers — each consumes rows lazily and writes to a text stream
+# ---------------------------------------------------------------------------
+
+def _display_chords(chords: str) -> str:
+    return " ".join(format_chord_display(c) for c in chords.split())
+
+
+def write_csv(rows, out):
+    writer = csv.writer(out)
+    writer.writerow(["key", "chords", "romans"])
+    for row in rows:
+        writer.writerow(row)
+
+
+def write_anki(rows, out):
+    """
+    Anki plain-text import (File → Import): tab-separated Front/Back/Tags,
+    with header directives so no import options need to be set by hand.
+    """
+    out.write("#separator:tab\n#html:true\n#columns:Front\tBack\tTags\n")
+    for key, chords, romans in rows:
+        front = (f"Key of {html.escape(format_key_display(key))} Major"
+                 f"<br>{html.escape(_display_chords(chords))}")
+        tag = "key_" + key.replace("#", "sharp")
+        out.write(f"{front}\t{html.escape(romans)}\t{tag}\n")
+
+
+_WORKSHEET_HEAD = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>
+  body  { font-family:sans-serif; margin:1.5cm; }
+  h1    { font-size:1.4rem; margin:0 0 .8rem; }
+  table { width:100%; border-collapse:collapse; }
+  th, td { border-bottom:1px solid #ccc; padding:.45rem .3rem; text-align:left; }
+  td.n  { width:2.5rem; color:#888; }
+  td.k  { width:5rem; }
+  td.c  { font-size:1.15rem; font-weight:700; }
+  td.a  { width:40%; }
+  tr    { page-break-inside:avoid; }
+  @media print { body { margin:0; } }
+</style></head><body>
+<h1>{title}</h1>
+<table><tr><th>#</th><th>Key</th><th>Chords</th><th>Roman numerals</th></tr>
+"""
+
+
+def write_html(rows, out, answers: bool = False):
+    """
+    Printable worksheet; print to PDF from the browser. With `answers=True`
+    the Roman numeral column is filled in, giving the answer key.
+    """
+    title = "Chord Flashcards — Answer Key" if answers else "Chord Flashcards"
+    out.write(_WORKSHEET_HEAD.replace("{title}", title))
+    for n, (key, chords, romans) in enumerate(rows, 1):
+        out.write(
+            f'<tr><td class="n">{n}</td>'
+            f'<td class="k">{html.escape(format_key_display(key))}</td>'
+            f'<td class="c">{html.escape(_display_chords(chords))}</td>'
+            f'<td class="a">{html.escape(romans) if answers else ""}</td></tr>\n')
+    out.write("</table></body></html>\n")
+
+
+# format id -> (writer, file extension, mime type)
+FORMATS = {
+    "csv":  (write_csv,  "csv",  "text/csv"),
+    "anki": (write_anki, "txt",  "text/plain"),
+    "html": (write_html, "html", "text/html"),
+}
+
+
+def export(fmt: str, rows, out, **kwargs):
+    """Write `rows` to the text stream `out` in format `fmt`."""
+    writer = FORMATS[fmt][0]
+    writer(rows, out, **kwargs)
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Export chord flashcard decks.")
+    p.add_argument("--format", choices=list(FORMATS), default="csv")
+    p.add_argument("-o", "--output", help="output file (default: stdout)")
+    p.add_argument("--no-triads", action="store_true", help="exclude triads")
+    p.add_argument("--no-sevenths", action="store_true", help="exclude 7th chords")
+    p.add_argument("--all", action="store_true",
+                   help="one card per chord in every key instead of random drills")
+    p.add_argument("--length", type=int, default=4, help="chords per drill")
+    p.add_argument("--count", type=int, default=100, help="number of drills")
+    p.add_argument("--seed", type=int, help="random seed, for reproducible decks")
+    p.add_argument("--answers", action="store_true", help="html: print the answer key")
+    args = p.parse_args(argv)
+
+    use_triads, use_sevenths = not args.no_triads, not args.no_sevenths
+    if not (use_triads or use_sevenths):
+        p.error("at least one chord type must be included")
+    if args.length < 1:
+        p.error("--length must be at least 1")
+    if args.count < 1:
+        p.error("--count must be at least 1")
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    if args.all:
+        drills = iter_all_cards(use_triads, use_sevenths)
+    else:
+        drills = iter_drills(build_pool(use_triads, use_sevenths), args.length, args.count)
+
+    kwargs = {"answers": args.answers} if args.format == "html" else {}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as out:
+            export(args.format, iter_rows(drills), out, **kwargs)
+    else:
+        export(args.format, iter_rows(drills), sys.stdout, **kwargs)
+
+
+if __name__ == "__main__":
+    main()
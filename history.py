@@ -0,0 +1,62 @@
+"""
+Per-answer attempt log, kept in the shared store (store.py).
+
+One record per chord answered:
+    {"t": 1700000000.0, "key": "C", "degree": 5, "quality": "dom7", "ok": True}
+"""
+import sqlite3
+import time
+from pathlib import Path
+
+import store
+from music_theory import parse_roman
+
+LOG_PATH = store.DB_PATH
+
+
+def make_attempts(prog: list, answers: list) -> list:
+    """
+    Build log records for a submitted progression.
+    `answers` holds the user's Roman numeral (or None) for each chord.
+    """
+    now = round(time.time(), 3)
+    records = []
+    for (key, _, roman), answer in zip(prog, answers):
+        degree, quality = parse_roman(roman)
+        records.append({"t": now, "key": key, "degree": degree,
+                        "quality": quality, "ok": answer == roman})
+    return records
+
+
+def log_attempts(records: list, path: str = LOG_PATH):
+    """Append records to the log. Failures are ignored — logging is best-effort."""
+    if not records:
+        return
+    try:
+        conn = store.connect(path)
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO attempts VALUES (?, ?, ?, ?, ?)",
+                    [(r["t"], r["key"], r["degree"], r["quality"], int(r["ok"]))
+                     for r in records])
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        pass
+
+
+def iter_attempts(path: str = LOG_PATH):
+    """
+    Yield every record in the log, streaming from the database. The store is
+    opened read-only, so a missing file raises sqlite3.Error instead of
+    being created empty.
+    """
+    conn = sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+    try:
+        for t, key, degree, quality, ok in conn.execute(
+                "SELECT t, key, degree, quality, ok FROM attempts"):
+            yield {"t": t, "key": key, "degree": degree,
+                   "quality": quality, "ok": bool(ok)}
+    finally:
+        conn.close()
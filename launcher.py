@@ -0,0 +1,148 @@
+"""
+Multi-worker launcher.
+
+Starts N `streamlit run app.py` worker processes on local ports and a small
+reverse proxy in front of them. Each Streamlit session is served by one
+process, so N workers give N GILs for the per-second timer reruns.
+
+Routing is sticky: the first response to a new browser sets a `cf_worker`
+cookie and later requests and reconnects go to the same worker. If that
+worker is down the browser is moved to another one. All workers share
+the same store (CHORD_DB), so attempt logs and classroom rooms are
+visible from any of them.
+
+The proxy works at TCP level. It reads the request head to choose a
+worker and then pipes bytes both ways, so HTTP and Streamlit's websocket
+pass through unchanged.
+
+    python launcher.py --workers 4 --port 8501
+"""
+import argparse
+import asyncio
+import os
+import re
+import signal
+import subprocess
+import sys
+
+import store
+
+COOKIE = "cf_worker"
+_COOKIE_RE = re.compile(rb"^cookie:.*\b" + COOKIE.encode() + rb"=(\d+)", re.I | re.M)
+MAX_HEAD = 64 * 1024
+
+
+def start_workers(n: int, base_port: int, app: str = "app.py") -> list:
+    """Spawn `n` Streamlit workers on consecutive ports, sharing one store."""
+    env = dict(os.environ, CHORD_DB=os.path.abspath(store.DB_PATH))
+    procs = []
+    for i in range(n):
+        procs.append(subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", app,
+             "--server.port", str(base_port + i),
+             "--server.address", "127.0.0.1",
+             "--server.headless", "true",
+             "--browser.gatherUsageStats", "false"],
+            env=env))
+    return procs
+
+
+class StickyProxy:
+    """Cookie-sticky TCP proxy over a list of local worker ports."""
+
+    def __init__(self, ports: list):
+        self.ports = ports
+        self.active = [0] * len(ports)  # open connections per worker
+
+    def _pick(self, head: bytes):
+        """(worker index, whether the cookie must be (re)set)."""
+        m = _COOKIE_RE.search(head)
+        if m and int(m.group(1)) < len(self.ports):
+            return int(m.group(1)), False
+        return self.active.index(min(self.active)), True
+
+    async def handle(self, client_r, client_w):
+        try:
+            head = await client_r.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            client_w.close()
+            return
+        idx, set_cookie = self._pick(head)
+        order = [idx] + [i for i in range(len(self.ports)) if i != idx]
+        for i in order:
+            try:
+                backend_r, backend_w = await asyncio.open_connection("127.0.0.1", self.ports[i])
+                break
+            except OSError:
+                set_cookie = True
+        else:
+            client_w.write(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\n\r\n")
+            await client_w.drain()
+            client_w.close()
+            return
+
+        self.active[i] += 1
+        try:
+            backend_w.write(head)
+            cookie = (f"Set-Cookie: {COOKIE}={i}; Path=/; HttpOnly; SameSite=Lax\r\n".encode()
+                      if set_cookie else None)
+            upstream = asyncio.ensure_future(self._pipe(client_r, backend_w))
+            await self._pipe(backend_r, client_w, cookie)
+            # the worker hung up: drop the client side too
+            upstream.cancel()
+        finally:
+            self.active[i] -= 1
+            for w in (client_w, backend_w):
+                w.close()
+
+    @staticmethod
+    async def _pipe(reader, writer, cookie: bytes = None):
+        try:
+            if cookie:
+                # insert the cookie header right after the first status line
+                writer.write(await reader.readuntil(b"\r\n") + cookie)
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                writer.write(data)
+                await writer.drain()
+            if writer.can_write_eof():
+                writer.write_eof()
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            pass
+
+
+async def serve(port: int, worker_ports: list):
+    proxy = StickyProxy(worker_ports)
+    server = await asyncio.start_server(proxy.handle, "0.0.0.0", port, limit=MAX_HEAD)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Run several app workers behind a sticky proxy.")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--port", type=int, default=8501, help="public port")
+    p.add_argument("--base-port", type=int, default=8601, help="first worker port")
+    p.add_argument("--app", default="app.py")
+    args = p.parse_args(argv)
+
+    procs = start_workers(args.workers, args.base_port, args.app)
+    ports = [args.base_port + i for i in range(args.workers)]
+    print(f"{args.workers} workers on ports {ports[0]}-{ports[-1]}, "
+          f"proxy on http://localhost:{args.port}")
+    try:
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        asyncio.run(serve(args.port, ports))
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
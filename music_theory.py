@@ -1,3 +1,8 @@
+import functools
+import heapq
+import json
+import math
+import os
 import random
 
 # ---------------------------------------------------------------------------
@@ -38,6 +43,7 @@ def build_roman(degree: int, quality_id: str) -> str:
     return base + q["symbol"]
 
 
+@functools.lru_cache(maxsize=None)
 def parse_roman(roman: str):
     """
     Parse a Roman numeral string back to (degree, quality_id).
@@ -110,10 +116,11 @@ SEVENTH_NAMES = {
 ALL_KEYS = list(TRIAD_NAMES.keys())
 
 
-def build_pool(use_triads: bool, use_sevenths: bool) -> list:
+@functools.lru_cache(maxsize=None)
+def build_pool(use_triads: bool, use_sevenths: bool) -> tuple:
     """
-    Returns a flat list of (key, chord_name, roman_str) tuples
-    based on selected chord types.
+    Returns a flat tuple of (key, chord_name, roman_str) tuples
+    based on selected chord types. Built once per process and shared.
     """
     pool = []
     for key in ALL_KEYS:
@@ -127,26 +134,142 @@ def build_pool(use_triads: bool, use_sevenths: bool) -> list:
                 roman = build_roman(deg, qual)
                 chord = SEVENTH_NAMES[key][i]
                 pool.append((key, chord, roman))
-    return pool
+    return tuple(pool)
 
 
-def get_progression(pool: list, length: int) -> list:
+def get_progression(pool: list, length: int, sampler: dict = None, rng=random) -> list:
     """
     Return a progression of `length` chords all from the same random key.
     Each item: (key, chord_name, roman_str).
+    With a `sampler` from build_weighted_sampler(), chords are drawn by
+    weight. Like the unweighted path, no chord repeats unless `length`
+    exceeds the key's chords: then every draw uses the alias table, O(1)
+    per chord; otherwise a weighted sample without replacement takes
+    O(k log k) over the key's k <= 14 chords. Pass a seeded random.Random
+    as `rng` for a reproducible progression.
     """
+    if sampler:
+        key_items, weights, table = sampler[rng.choice(list(sampler))]
+        if length > len(key_items):
+            return [key_items[alias_draw(table, rng)] for _ in range(length)]
+        return [key_items[i] for i in weighted_sample(weights, length, rng)]
     # filter pool to a random key
-    key = random.choice(ALL_KEYS)
+    key = rng.choice(ALL_KEYS)
     key_items = [item for item in pool if item[0] == key]
     if not key_items:
         key_items = pool  # fallback
     if length > len(key_items):
-        chosen = random.choices(key_items, k=length)
+        chosen = rng.choices(key_items, k=length)
     else:
-        chosen = random.sample(key_items, k=length)
+        chosen = rng.sample(key_items, k=length)
     return chosen
 
 
+# ---------------------------------------------------------------------------
+# Difficulty-weighted sampling
+# ---------------------------------------------------------------------------
+
+DIFFICULTY_PATH = os.environ.get("CHORD_DIFFICULTY_TABLE", "difficulty.json")
+
+
+def card_id(key: str, degree: int, quality_id: str) -> str:
+    """Identifier of a card in the difficulty table, e.g. 'Bb:5:dom7'."""
+    return f"{key}:{degree}:{quality_id}"
+
+
+def load_difficulty(path: str = DIFFICULTY_PATH) -> dict:
+    """
+    Load the table written by calibrate.py:
+    {"ability": float, "cards": {card_id: difficulty}}.
+    Returns an empty table if the file is missing, unreadable or not in
+    that shape.
+    """
+    empty = {"ability": 0.0, "cards": {}}
+    try:
+        with open(path, encoding="utf-8") as f:
+            table = json.load(f)
+    except (OSError, ValueError):
+        return empty
+    if not isinstance(table, dict) or not isinstance(table.get("cards", {}), dict):
+        return empty
+    ability = table.get("ability", 0.0)
+    if not _is_finite_number(ability):
+        return empty
+    # drop individual cards that aren't finite numbers rather than the table
+    cards = {cid: float(b) for cid, b in table.get("cards", {}).items()
+             if _is_finite_number(b)}
+    return {"ability": float(ability), "cards": cards}
+
+
+def _is_finite_number(x) -> bool:
+    return isinstance(x, (int, float)) and not isinstance(x, bool) and math.isfinite(x)
+
+
+def build_alias_table(weights: list) -> tuple:
+    """
+    Walker/Vose alias table for the given non-negative weights.
+    Returns (prob, alias); draw with alias_draw().
+    """
+    n = len(weights)
+    total = float(sum(weights))
+    if n == 0 or total <= 0:
+        return [1.0] * n, list(range(n))
+    scaled = [w * n / total for w in weights]
+    prob, alias = [1.0] * n, list(range(n))
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+    while small and large:
+        s, l = small.pop(), large.pop()
+        prob[s], alias[s] = scaled[s], l
+        scaled[l] -= 1.0 - scaled[s]
+        (small if scaled[l] < 1.0 else large).append(l)
+    return prob, alias
+
+
+def alias_draw(table: tuple, rng=random) -> int:
+    """Draw an index from an alias table in O(1)."""
+    prob, alias = table
+    i = rng.randrange(len(prob))
+    return i if rng.random() < prob[i] else alias[i]
+
+
+def weighted_sample(weights: list, k: int, rng=random) -> list:
+    """
+    Indices of `k` distinct items drawn by weight without replacement
+    (Efraimidis–Spirakis: keep the k largest u ** (1 / w)).
+    """
+    keys = [rng.random() ** (1.0 / w) if w > 0 else 0.0 for w in weights]
+    return heapq.nlargest(k, range(len(weights)), key=keys.__getitem__)
+
+
+def build_weighted_sampler(pool: list, difficulty: dict, target: float = 0.7,
+                           spread: float = 0.15) -> dict:
+    """
+    Per-key alias tables over `pool`, weighting each chord by how close its
+    predicted success rate is to `target`. Predicted success follows the
+    calibration model: sigmoid(ability - difficulty); unseen cards count as
+    difficulty 0. Returns {key: (items, weights, alias_table)} for
+    get_progression().
+    """
+    ability = difficulty.get("ability", 0.0)
+    cards = difficulty.get("cards", {})
+    by_key = {}
+    for item in pool:
+        by_key.setdefault(item[0], []).append(item)
+    sampler = {}
+    for key, items in by_key.items():
+        weights = []
+        for k, _, roman in items:
+            deg, qual = parse_roman(roman)
+            b = cards.get(card_id(k, deg, qual), 0.0)
+            # clamp the logit so extreme tables can't overflow math.exp
+            p = 1.0 / (1.0 + math.exp(min(max(b - ability, -50.0), 50.0)))
+            # floor keeps every chord reachable, however far from target
+            weights.append(0.05 + math.exp(-((p - target) / spread) ** 2))
+        sampler[key] = (items, weights, build_alias_table(weights))
+    return sampler
+
+
 def format_key_display(key: str) -> str:
     return key.replace("b", "\u266d")
 
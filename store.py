@@ -0,0 +1,39 @@
+"""
+Shared local store for persistent data (attempt log, classroom rooms and
+leaderboards).
+
+A single SQLite file in WAL mode, so several app worker processes (see
+launcher.py) can read and write it at once and any worker can serve a
+returning user. Point every worker at the same file with CHORD_DB.
+"""
+import os
+import sqlite3
+
+DB_PATH = os.environ.get("CHORD_DB", "chords.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts (
+    t REAL, key TEXT, degree INTEGER, quality TEXT, ok INTEGER);
+CREATE TABLE IF NOT EXISTS race_rooms (
+    code TEXT PRIMARY KEY, settings TEXT, created REAL, started REAL);
+CREATE TABLE IF NOT EXISTS race_scores (
+    room TEXT, created REAL, player TEXT, token TEXT,
+    score INTEGER, correct INTEGER, incorrect INTEGER, round INTEGER,
+    updated REAL, PRIMARY KEY (room, created, player));
+"""
+
+_initialised = set()
+
+
+def connect(path: str = DB_PATH) -> sqlite3.Connection:
+    """
+    Open a connection, creating the schema on first use in this process.
+    Callers close it; use `with conn:` for a transaction.
+    """
+    conn = sqlite3.connect(path, timeout=10)
+    if path not in _initialised:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        _initialised.add(path)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn